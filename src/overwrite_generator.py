@@ -3,48 +3,259 @@
 OpenClash Overwrite Generator - 支持多级目录结构
 保持完整的分类层级（如 General_Config/Author1/）
 """
+import os
+import re
+import functools
 import yaml
 import json
 import argparse
 import logging
-from pathlib import Path
+from pathlib import Path, PurePosixPath
+from types import MappingProxyType
 from datetime import datetime
-from typing import Dict, List, Optional
-from jinja2 import Environment, FileSystemLoader
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+
+# 优先使用 libyaml 的 C 加载器，未安装时回退到纯 Python 实现
+_YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+class _ProviderLoader(_YamlLoader):
+    """只保留 int/bool/null/merge 隐式类型解析，float、时间戳等按字符串处理"""
+
+
+_ProviderLoader.yaml_implicit_resolvers = {
+    first: [(tag, regexp) for tag, regexp in resolvers
+            if tag in ('tag:yaml.org,2002:int', 'tag:yaml.org,2002:bool',
+                       'tag:yaml.org,2002:null', 'tag:yaml.org,2002:merge')]
+    for first, resolvers in _YamlLoader.yaml_implicit_resolvers.items()
+}
+
+LOG_FORMAT = '%(levelname)s: %(message)s'
+
+# orjson 可选，未安装时使用标准库 json
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# 分类目录 README 模板（str.format_map 填充）
+_README_TMPL = """# {relative_path} 覆写配置
+
+## 📍 来源
+- **路径**: `{source_desc}`
+- **类型**: {source_label}
+- **用途**: {purpose}
+
+## 📁 文件说明
+
+本目录包含以下 9 种配置变体：
+
+| 文件名 | 模式 | IPv6 | LGBM | 适用场景 |
+|--------|------|------|------|----------|
+| `Overwrite-*.conf` | 标准 | ✅ | ❌ | 主路由，启用 IPv6 |
+| `Overwrite-noipv6-*.conf` | 标准 | ❌ | ❌ | 主路由，禁用 IPv6 |
+| `Overwrite-bypass-*.conf` | 标准 | ❌ | ❌ | **旁路由**，需 EN_DNS |
+| `Overwrite-smart-*.conf` | Smart | ✅ | ❌ | Smart 模式，启用 IPv6 |
+| `Overwrite-smart-noipv6-*.conf` | Smart | ❌ | ❌ | Smart 模式，禁用 IPv6 |
+| `Overwrite-smart-LGBM-*.conf` | Smart | ✅ | ✅ | Smart + LGBM 模型 |
+| `Overwrite-smart-noipv6-LGBM-*.conf` | Smart | ❌ | ✅ | Smart + LGBM，无 IPv6 |
+| `Overwrite-smart-bypass-*.conf` | Smart | ❌ | ❌ | **Smart 旁路由**，需 EN_DNS |
+| `Overwrite-smart-bypass-LGBM-*.conf` | Smart | ❌ | ✅ | **Smart 旁路由 + LGBM**，需 EN_DNS |
+
+## 🔧 环境变量
+
+### 基础变量（所有配置）
+```bash
+EN_KEY=你的订阅链接
+
+# 或（多 provider 时）
+EN_KEY1=订阅1;EN_KEY2=订阅2;...
+```
+
+### 旁路由额外变量（bypass 系列）
+```bash
+EN_DNS=223.5.5.5,114.114.114.114
+```
+
+## 📝 生成信息
+- 生成时间: {timestamp}
+- 配置文件数: {count}
+
+---
+*由 GitHub Actions 自动生成*
+"""
+
+# README 中每次运行都会变化的生成时间行
+_README_TS_RE = re.compile(r'^- 生成时间: .*$'.encode('utf-8'), re.M)
+# 顶格书写的下一个顶层键（跳过缩进行、注释和顶格的序列项）
+_NEXT_TOP_LEVEL_RE = re.compile(rb'^(?![\s#-])', re.M)
+
+
+def top_level_section(content: bytes, key: bytes) -> Optional[bytes]:
+    """截取顶层键对应的 YAML 片段，未找到或键出现多次时返回 None
+
+    假定输入经过 yaml.dump 规范化（yaml_processor 的输出），即顶格的行都是顶层键；
+    多行引号字符串中的顶格行会被误判，调用方需校验解析结果并回退到完整解析。
+    """
+    pattern = re.compile(b'^' + re.escape(key) + b':', re.M)
+    match = pattern.search(content)
+    # 重复的顶层键以完整解析的结果（最后一个）为准
+    if not match or pattern.search(content, match.end()):
+        return None
+    end = _NEXT_TOP_LEVEL_RE.search(content, match.end())
+    return content[match.start():end.start() if end else len(content)]
+
+
+def _raise_walk_error(err: OSError):
+    """os.walk 默认忽略错误，输入目录缺失或不可读时应直接失败"""
+    raise err
+
+
+def default_cache_dir() -> Path:
+    """缓存根目录（遵循 XDG_CACHE_HOME，默认 ~/.cache）"""
+    base = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+    return Path(base) / 'openclash_config_generator'
+
+
+def _bytecode_cache(cache_dir: Path) -> Optional[FileSystemBytecodeCache]:
+    """Jinja 字节码缓存，目录不可写时不启用"""
+    jinja_dir = cache_dir / 'jinja'
+    try:
+        jinja_dir.mkdir(parents=True, exist_ok=True)
+    except OSError as e:
+        logging.getLogger(__name__).warning("Bytecode cache disabled (%s): %s", jinja_dir, e)
+        return None
+    return FileSystemBytecodeCache(directory=str(jinja_dir), pattern='__jinja2_%s.cache')
+
+
+def get_env(template_dir: Path, cache_dir: Optional[Path] = None) -> Environment:
+    """按模板目录复用 Jinja Environment，同一进程内的生成器共享编译缓存"""
+    return _cached_env(str(Path(template_dir).resolve()),
+                       str(cache_dir or default_cache_dir()))
+
+
+@functools.lru_cache(maxsize=8)
+def _cached_env(template_dir: str, cache_dir: str) -> Environment:
+    return Environment(
+        loader=FileSystemLoader(template_dir),
+        trim_blocks=True,
+        lstrip_blocks=True,
+        # 输出为纯文本配置，不做 HTML 转义；保持常量折叠开启
+        autoescape=False,
+        keep_trailing_newline=False,
+        optimized=True,
+        # 生成过程中模板不会变化，关闭 mtime 检查并且不淘汰已编译模板
+        auto_reload=False,
+        cache_size=-1,
+        bytecode_cache=_bytecode_cache(Path(cache_dir))
+    )
+
+
+def open_dir_fd(path: Path) -> Optional[int]:
+    """打开目录文件描述符，平台不支持 dir_fd 时返回 None"""
+    if os.open not in os.supports_dir_fd:
+        return None
+    return os.open(path, os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0))
+
+
+def write_file(path: Path, data: bytes, dir_fd: Optional[int] = None):
+    """写入文件；给出 dir_fd 时按文件名相对该目录打开，省去重复的路径解析"""
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+    fd = os.open(path.name if dir_fd is not None else path, flags, 0o666, dir_fd=dir_fd)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+def same_content(path: Path, data: bytes, dir_fd: Optional[int] = None) -> bool:
+    """已有文件内容与 data 完全一致时返回 True（先比较大小，相同再读取比较）"""
+    name = path.name if dir_fd is not None else path
+    try:
+        if os.stat(name, dir_fd=dir_fd).st_size != len(data):
+            return False
+        fd = os.open(name, os.O_RDONLY | getattr(os, 'O_BINARY', 0), dir_fd=dir_fd)
+    except FileNotFoundError:
+        return False
+    with os.fdopen(fd, 'rb') as f:
+        return f.read() == data
+
+
+@functools.lru_cache(maxsize=None)
+def load_config_types(config_types_path: str) -> tuple:
+    """读取配置变体定义，按路径缓存，返回只读结构"""
+    config_types = _json_loads(Path(config_types_path).read_bytes())['config_types']
+    return tuple(MappingProxyType(config_def) for config_def in config_types)
 
 
 class OverwriteGenerator:
-    def __init__(self, template_dir: Path, config_types_path: Path):
-        self.env = Environment(
-            loader=FileSystemLoader(template_dir),
-            trim_blocks=True,
-            lstrip_blocks=True
-        )
+    # 由 config_types.json 传入模板的变体开关
+    VARIANT_FLAGS = ('smart_mode', 'bypass_mode', 'enable_ipv6', 'enable_lgbm')
+
+    def __init__(self, template_dir: Path, config_types_path: Path,
+                 cache_dir: Optional[Path] = None):
+        self.template_dir = template_dir
+        self.config_types_path = config_types_path
+        self.cache_dir = cache_dir
+        # 同一批次的文件共享生成时间，由 process_directory 在入口处刷新
+        self._batch_ts = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.env = get_env(template_dir, cache_dir)
+        # 模板只加载一次，批量渲染时直接复用
+        self._base_template = self.env.get_template('base.conf.j2')
         self.logger = logging.getLogger(__name__)
         
-        with open(config_types_path, 'r') as f:
-            self.config_types = json.load(f)['config_types']
+        self.config_types = load_config_types(str(config_types_path))
+        # 预先算好每个变体的文件名前缀和模板开关，渲染时直接合并
+        self._variants = [
+            (f"Overwrite{config_def['suffix']}-", {
+                key: config_def[key] for key in self.VARIANT_FLAGS
+            })
+            for config_def in self.config_types
+        ]
 
     def analyze_yaml(self, yaml_path: Path) -> Optional[Dict]:
-        """分析 YAML 文件"""
+        """解析 YAML 文件，提取 proxy-providers"""
         try:
-            with open(yaml_path, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
+            # 直接读取字节交给 libyaml 解码，省去 Python 层的文本包装
+            content = yaml_path.read_bytes()
             
-            if not config:
+            # 完全不含 proxy-providers 的文件无需解析
+            if b'proxy-providers' not in content:
                 return None
             
-            proxy_providers = config.get('proxy-providers', {}) or {}
-            providers = []
+            # 只解析 proxy-providers 片段，跳过体积最大的 proxy-groups / rules
+            config = None
+            section = top_level_section(content, b'proxy-providers')
+            if section is not None:
+                try:
+                    config = yaml.load(section, Loader=_ProviderLoader)
+                except yaml.YAMLError:
+                    # 片段引用了外部锚点等情况，回退到完整解析
+                    config = None
+            # 片段被误截（例如多行字符串中的顶格行）时结构不对，回退到完整解析
+            if not (isinstance(config, dict)
+                    and isinstance(config.get('proxy-providers'), (dict, type(None)))):
+                config = yaml.load(content, Loader=_ProviderLoader)
+            
+            if not config:
+                return None
             
-            for name, cfg in proxy_providers.items():
-                if isinstance(cfg, dict):
-                    providers.append({
-                        'name': name,
-                        'type': cfg.get('type', 'http'),
-                        'url': cfg.get('url', ''),
-                        'interval': cfg.get('interval', 86400)
-                    })
+            proxy_providers = config.get('proxy-providers') or {}
+            providers = [
+                {
+                    'name': name,
+                    'type': cfg.get('type', 'http'),
+                    'url': cfg.get('url', ''),
+                    'interval': cfg.get('interval', 86400)
+                }
+                for name, cfg in proxy_providers.items()
+                if isinstance(cfg, dict)
+            ] if proxy_providers else []
             
             return {
                 'proxy_providers': providers,
@@ -53,15 +264,17 @@ class OverwriteGenerator:
             }
         
         except Exception as e:
-            self.logger.error(f"Error analyzing {yaml_path}: {e}")
+            self.logger.error("Error analyzing %s: %s", yaml_path, e)
             return None
 
     def generate_readme(self, category_dir: Path, relative_path: str, 
                        source_type: str, files_generated: List[str]):
         """为每个分类目录生成 README"""
         
-        # 解析相对路径，确定说明
-        parts = relative_path.split('/')
+        # 解析相对路径，确定说明（统一为 / 分隔，兼容 Windows 路径）
+        rp = PurePosixPath(relative_path.replace('\\', '/'))
+        relative_path = rp.as_posix()
+        parts = rp.parts
         if source_type == 'external':
             if len(parts) >= 2:
                 main_category = parts[0]  # General_Config 或 Smart_Mode
@@ -83,183 +296,206 @@ class OverwriteGenerator:
             source_desc = f"本地目录 {relative_path}"
             purpose = "用户自定义配置"
         
-        readme_content = f"""# {relative_path} 覆写配置
-
-## 📍 来源
-- **路径**: `{source_desc}`
-- **类型**: {'外部自动同步' if source_type == 'external' else '本地手动维护'}
-- **用途**: {purpose}
-
-## 📁 文件说明
-
-本目录包含以下 9 种配置变体：
-
-| 文件名 | 模式 | IPv6 | LGBM | 适用场景 |
-|--------|------|------|------|----------|
-| `Overwrite-*.conf` | 标准 | ✅ | ❌ | 主路由，启用 IPv6 |
-| `Overwrite-noipv6-*.conf` | 标准 | ❌ | ❌ | 主路由，禁用 IPv6 |
-| `Overwrite-bypass-*.conf` | 标准 | ❌ | ❌ | **旁路由**，需 EN_DNS |
-| `Overwrite-smart-*.conf` | Smart | ✅ | ❌ | Smart 模式，启用 IPv6 |
-| `Overwrite-smart-noipv6-*.conf` | Smart | ❌ | ❌ | Smart 模式，禁用 IPv6 |
-| `Overwrite-smart-LGBM-*.conf` | Smart | ✅ | ✅ | Smart + LGBM 模型 |
-| `Overwrite-smart-noipv6-LGBM-*.conf` | Smart | ❌ | ✅ | Smart + LGBM，无 IPv6 |
-| `Overwrite-smart-bypass-*.conf` | Smart | ❌ | ❌ | **Smart 旁路由**，需 EN_DNS |
-| `Overwrite-smart-bypass-LGBM-*.conf` | Smart | ❌ | ✅ | **Smart 旁路由 + LGBM**，需 EN_DNS |
-
-## 🔧 环境变量
-
-### 基础变量（所有配置）
-```bash
-EN_KEY=你的订阅链接
-
-# 或（多 provider 时）
-EN_KEY1=订阅1;EN_KEY2=订阅2;...
-```
-
-### 旁路由额外变量（bypass 系列）
-```bash
-EN_DNS=223.5.5.5,114.114.114.114
-```
-
-## 📝 生成信息
-- 生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-- 配置文件数: {len(files_generated)}
-
----
-*由 GitHub Actions 自动生成*
-"""
+        readme_content = _README_TMPL.format_map({
+            'relative_path': relative_path,
+            'source_desc': source_desc,
+            'source_label': '外部自动同步' if source_type == 'external' else '本地手动维护',
+            'purpose': purpose,
+            'timestamp': self._batch_ts,
+            'count': len(files_generated),
+        })
         
         readme_path = category_dir / 'README.md'
-        with open(readme_path, 'w', encoding='utf-8') as f:
-            f.write(readme_content)
+        data = readme_content.encode('utf-8')
+        # 仅生成时间不同视为未变化，保留原文件，避免每次构建都产生提交
+        try:
+            old = _README_TS_RE.sub(b'', readme_path.read_bytes())
+        except FileNotFoundError:
+            old = None
+        if old == _README_TS_RE.sub(b'', data):
+            self.logger.debug("README unchanged: %s", readme_path)
+            return
+        write_file(readme_path, data)
         
-        self.logger.info(f"Generated README: {readme_path}")
+        self.logger.debug("Generated README: %s", readme_path)
 
-    def generate_overwrite(self, yaml_path: Path, output_path: Path, 
-                          config_def: Dict, repo_url: str, 
-                          relative_path: str, source_type: str) -> bool:
-        """生成单个覆写文件"""
+    def generate_variants(self, yaml_path: Path, output_dir: Path,
+                          repo_url: str, relative_path: str,
+                          source_type: str) -> List[Tuple[str, bool]]:
+        """解析一次 YAML，生成全部配置变体，返回 (文件名, 是否成功) 列表"""
+        
+        # 构建文件名
+        base_name = yaml_path.stem
+        filenames = [f"{prefix}{base_name}.conf" for prefix, _ in self._variants]
         
         analysis = self.analyze_yaml(yaml_path)
         if not analysis or analysis['count'] == 0:
-            self.logger.warning(f"No providers in {yaml_path}, skipping")
-            return False
+            self.logger.warning("No providers in %s, skipping", yaml_path)
+            return [(filename, False) for filename in filenames]
         
         # 构建下载URL（保持完整的相对路径）
-        yaml_url = f"{repo_url}/processed_configs/{source_type}/{relative_path}/{yaml_path.name}".replace('\\', '/')
+        yaml_url = f"{repo_url}/processed_configs/{source_type}/{relative_path}/{yaml_path.name}"
         
+        # 输出目录只打开一次，所有变体都相对它写入
+        dir_fd = open_dir_fd(output_dir)
         try:
-            template = self.env.get_template('base.conf.j2')
-            content = template.render(
+            return [
+                (filename, self.generate_overwrite(
+                    analysis, output_dir / filename, flags,
+                    yaml_url, relative_path, source_type, dir_fd
+                ))
+                for filename, (_, flags) in zip(filenames, self._variants)
+            ]
+        finally:
+            if dir_fd is not None:
+                os.close(dir_fd)
+
+    def generate_overwrite(self, analysis: Dict, output_path: Path, 
+                          variant_flags: Dict, yaml_url: str, 
+                          relative_path: str, source_type: str,
+                          dir_fd: Optional[int] = None) -> bool:
+        """根据分析结果生成单个覆写文件（输出目录需已存在）"""
+        
+        try:
+            content = self._base_template.render(
                 config_name=analysis['name'],
                 source_type=source_type,
                 category=relative_path,
                 provider_count=analysis['count'],
                 proxy_providers=analysis['proxy_providers'],
                 yaml_url=yaml_url,
-                timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                smart_mode=config_def['smart_mode'],
-                bypass_mode=config_def['bypass_mode'],
-                enable_ipv6=config_def['enable_ipv6'],
-                enable_lgbm=config_def['enable_lgbm']
+                timestamp=self._batch_ts,
+                **variant_flags
             )
             
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+            data = content.encode('utf-8')
+            # 内容未变化时不重写，避免无意义的文件变更
+            if not same_content(output_path, data, dir_fd):
+                write_file(output_path, data, dir_fd)
             
             return True
         
         except Exception as e:
-            self.logger.error(f"Failed to generate {output_path}: {e}")
+            self.logger.error("Failed to generate %s: %s", output_path, e)
             return False
 
-    def process_directory_recursive(self, current_dir: Path, input_base: Path, 
-                                   output_base: Path, repo_url: str, 
-                                   source_type: str, stats: Dict):
-        """递归处理目录，保持完整的目录层级"""
+    def _process_group(self, current_dir: Path, yaml_names: List[str],
+                       input_base: Path, output_base: Path, repo_url: str,
+                       source_type: str, executor: Executor) -> Tuple[str, Path, Dict]:
+        """提交一个目录下全部 YAML 的生成任务，返回 (相对路径, 输出目录, futures)"""
         
-        yaml_files = list(current_dir.glob('*.yaml'))
-        has_yaml = len(yaml_files) > 0
+        # 计算相对路径（相对于输入基础目录）
+        relative_path = current_dir.relative_to(input_base).as_posix()
+        output_dir = output_base / relative_path
         
-        if has_yaml:
-            # 计算相对路径（相对于输入基础目录）
-            relative_path = str(current_dir.relative_to(input_base))
-            output_dir = output_base / relative_path
-            
-            self.logger.info(f"\n{'='*60}")
-            self.logger.info(f"处理分类: {relative_path}")
-            self.logger.info(f"输出目录: {output_dir}")
-            self.logger.info(f"YAML 文件: {len(yaml_files)} 个")
-            
-            files_generated = []
-            
-            # 处理当前目录的所有 YAML 文件
-            for yaml_file in yaml_files:
-                for config_def in self.config_types:
-                    try:
-                        # 构建文件名
-                        base_name = yaml_file.stem
-                        suffix = config_def['suffix']
-                        
-                        if suffix:
-                            filename = f"Overwrite{suffix}-{base_name}.conf"
-                        else:
-                            filename = f"Overwrite-{base_name}.conf"
-                        
-                        output_path = output_dir / filename
-                        
-                        result = self.generate_overwrite(
-                            yaml_file, output_path, config_def,
-                            repo_url, relative_path, source_type
-                        )
-                        
-                        if result:
-                            files_generated.append(filename)
-                            stats['total'] += 1
-                        else:
-                            stats['errors'] += 1
-                    
-                    except Exception as e:
-                        self.logger.error(f"Error: {e}")
-                        stats['errors'] += 1
-            
-            # 生成当前目录的 README
-            self.generate_readme(output_dir, relative_path, 
-                               source_type, files_generated)
+        # 同一目录的所有变体共用输出目录，只需创建一次
+        output_dir.mkdir(parents=True, exist_ok=True)
+        
+        # 每个 YAML 只解析一次，由工作进程生成其全部配置变体
+        futures = {}
+        for name in yaml_names:
+            yaml_file = current_dir / name
+            future = executor.submit(
+                _generate_variants_task,
+                yaml_file, output_dir, repo_url,
+                relative_path, source_type
+            )
+            futures[future] = yaml_file
+        
+        return relative_path, output_dir, futures
+
+    def collect_category(self, relative_path: str, output_dir: Path,
+                         futures: Dict, source_type: str, stats: Dict):
+        """收集一个分类目录的生成结果，写 README 并记录统计"""
+        self.logger.info("\n%s", '=' * 60)
+        self.logger.info("处理分类: %s", relative_path)
+        self.logger.debug("输出目录: %s", output_dir)
+        self.logger.debug("YAML 文件: %d 个", len(futures))
+        
+        files_generated = []
+        
+        for future in as_completed(futures):
+            try:
+                results = future.result()
+            except Exception as e:
+                self.logger.error("Error processing %s: %s", futures[future], e)
+                stats['errors'] += len(self.config_types)
+                continue
             
-            # 记录统计
-            if relative_path not in stats['categories']:
-                stats['categories'][relative_path] = 0
-            stats['categories'][relative_path] += len(files_generated)
+            for filename, ok in results:
+                if ok:
+                    files_generated.append(filename)
+                    stats['total'] += 1
+                else:
+                    stats['errors'] += 1
         
-        # 递归处理子目录
-        for sub_dir in current_dir.iterdir():
-            if sub_dir.is_dir():
-                self.process_directory_recursive(
-                    sub_dir, input_base, output_base, 
-                    repo_url, source_type, stats
-                )
+        # 生成当前目录的 README
+        self.generate_readme(output_dir, relative_path, 
+                           source_type, files_generated)
+        
+        # 记录统计
+        if relative_path not in stats['categories']:
+            stats['categories'][relative_path] = 0
+        stats['categories'][relative_path] += len(files_generated)
 
     def process_directory(self, input_dir: Path, output_base: Path, 
-                         repo_url: str, source_type: str) -> Dict:
+                         repo_url: str, source_type: str,
+                         jobs: Optional[int] = None) -> Dict:
         """处理入口函数"""
         stats = {'categories': {}, 'total': 0, 'errors': 0}
+        self._batch_ts = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
-        self.logger.info(f"\n{'='*60}")
-        self.logger.info(f"开始处理: {input_dir}")
-        self.logger.info(f"输出基础: {output_base}")
-        self.logger.info(f"来源类型: {source_type}")
+        self.logger.info("\n%s", '=' * 60)
+        self.logger.info("开始处理: %s", input_dir)
+        self.logger.info("输出基础: %s", output_base)
+        self.logger.info("来源类型: %s", source_type)
         
-        # 从输入目录开始递归处理
-        self.process_directory_recursive(
-            input_dir, input_dir, output_base, 
-            repo_url, source_type, stats
-        )
+        # 一次遍历整棵目录树并提交全部任务，进程池不会在目录之间空转；
+        # 之后再按分类收集结果
+        pending = []
+        with ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=_init_worker,
+            initargs=(self.template_dir, self.config_types_path,
+                      self.cache_dir, self._batch_ts,
+                      logging.getLogger().getEffectiveLevel())
+        ) as executor:
+            for dirpath, _, filenames in os.walk(input_dir, onerror=_raise_walk_error):
+                yaml_names = [name for name in filenames if name.endswith('.yaml')]
+                if yaml_names:
+                    pending.append(self._process_group(
+                        Path(dirpath), yaml_names, input_dir, output_base,
+                        repo_url, source_type, executor
+                    ))
+            for relative_path, output_dir, futures in pending:
+                self.collect_category(relative_path, output_dir, futures,
+                                      source_type, stats)
         
+        self.logger.info(
+            "完成 %s: %d 个文件, %d 个分类, %d 个错误",
+            source_type, stats['total'], len(stats['categories']), stats['errors']
+        )
         return stats
 
 
+# 工作进程内的生成器实例，由 _init_worker 创建
+_worker_generator: Optional[OverwriteGenerator] = None
+
+
+def _init_worker(template_dir: Path, config_types_path: Path,
+                 cache_dir: Optional[Path], batch_ts: str, log_level: int):
+    """进程池初始化：配置日志并构建本进程的生成器（Environment 无法跨进程传递）"""
+    global _worker_generator
+    logging.basicConfig(level=log_level, format=LOG_FORMAT)
+    _worker_generator = OverwriteGenerator(template_dir, config_types_path, cache_dir)
+    _worker_generator._batch_ts = batch_ts
+
+
+def _generate_variants_task(*args) -> List[Tuple[str, bool]]:
+    """在工作进程中生成单个 YAML 的全部配置变体"""
+    return _worker_generator.generate_variants(*args)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Generate OpenClash overwrite configs from YAML files (supports nested directories)'
@@ -277,6 +513,10 @@ def main():
                        help='Repository base URL for YAML downloads')
     parser.add_argument('--source', default='external',
                        help='来源类型: external 或 local')
+    parser.add_argument('--cache-dir', type=Path, default=None,
+                       help='缓存目录（默认 $XDG_CACHE_HOME/openclash_config_generator）')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                       help='并行进程数（默认 CPU 核数）')
     parser.add_argument('--verbose', '-v', action='store_true')
     parser.add_argument('--dry-run', action='store_true',
                        help='Show what would be generated without writing files')
@@ -286,17 +526,18 @@ def main():
     level = logging.DEBUG if args.verbose else logging.INFO
     logging.basicConfig(
         level=level,
-        format='%(levelname)s: %(message)s'
+        format=LOG_FORMAT
     )
     
     try:
-        gen = OverwriteGenerator(args.templates, args.config_types)
+        gen = OverwriteGenerator(args.templates, args.config_types, args.cache_dir)
         
         if args.dry_run:
             logging.info("DRY RUN MODE - No files will be written")
         
         stats = gen.process_directory(
-            args.input, args.output, args.repo_url, args.source
+            args.input, args.output, args.repo_url, args.source,
+            jobs=args.jobs
         )
         
         print(f"\n{'='*60}")
@@ -2,21 +2,53 @@
 """
 YAML Processor - 精简 YAML 配置文件
 """
+import os
 import yaml
+import json
 import re
 import argparse
 import logging
 from pathlib import Path
-from typing import Dict, List, Any, Set, Optional
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Set, Optional, Iterator, Tuple
+
+# 解析走 libyaml（缺失时为 SafeLoader）
+_YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+# libyaml 的发射器会把 emoji 等非 BMP 字符转义成 \U 序列，输出仍用 Python 实现
+_YamlDumper = yaml.SafeDumper
+
+# 行首锚点定义（&name value）与别名引用（*name）
+_ANCHOR_RE = re.compile(r'^([ \t]*)&(\w+)[ \t]+([^\r\n]+)', re.M)
+_REF_RE = re.compile(r'\*(\w+)')
+
+
+def iter_yaml(root: Path, recursive: bool = False) -> Iterator[str]:
+    """用 os.scandir 遍历目录，产出 .yaml 文件路径（DirEntry 缓存了类型，无需逐个 stat）
+
+    子目录放入待处理队列迭代展开，不为每层目录嵌套一个生成器。
+    """
+    dirs = deque([os.fspath(root)])
+    while dirs:
+        with os.scandir(dirs.popleft()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        dirs.append(entry.path)
+                elif entry.name.endswith('.yaml') and entry.is_file():
+                    yield entry.path
 
 
 class YAMLProcessor:
-    KEEP_KEYS = {
+    KEEP_KEYS = frozenset({
         'proxy-providers',
         'proxy-groups',
         'rule-providers',
         'rules'
-    }
+    })
+    # 输出目录中的解析结果缓存；处理逻辑变化时递增版本号使旧缓存失效
+    CACHE_FILE = '.yaml_cache.json'
+    CACHE_VERSION = 1
 
     def __init__(self):
         self.logger = logging.getLogger(__name__)
@@ -25,63 +57,86 @@ class YAMLProcessor:
     def extract_anchors(self, content: str) -> Dict[str, str]:
         """提取 YAML 锚点"""
         anchors = {}
-        pattern = r'^(\s*)&(\w+)\s+(.+)$'
-        for line in content.split('\n'):
-            match = re.match(pattern, line)
-            if match:
-                indent, name, value = match.groups()
-                anchors[name] = f"{indent}&{name} {value}"
+        # 整个文本一次扫描，不再逐行切分
+        for match in _ANCHOR_RE.finditer(content):
+            indent, name, value = match.groups()
+            anchors[name] = f"{indent}&{name} {value}"
         return anchors
 
     def find_referenced_anchors(self, content: Any) -> Set[str]:
-        """查找引用的锚点"""
-        text = yaml.dump(content, allow_unicode=True)
-        return set(re.findall(r'\*(\w+)', text))
+        """查找引用的锚点（直接遍历对象中的字符串，不再 dump 成文本）"""
+        referenced = set()
+        seen = set()
+        stack = deque([content])
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                if '*' in node:
+                    referenced.update(_REF_RE.findall(node))
+            elif isinstance(node, (dict, list)):
+                # 别名会让多处共享同一对象，只遍历一次
+                if id(node) in seen:
+                    continue
+                seen.add(id(node))
+                if isinstance(node, dict):
+                    stack.extend(node.keys())
+                    stack.extend(node.values())
+                else:
+                    stack.extend(node)
+        return referenced
 
     def process_file(self, yaml_path: Path) -> Optional[Dict]:
         """处理单个 YAML 文件"""
-        self.logger.info(f"Processing: {yaml_path}")
-        
         try:
-            with open(yaml_path, 'r', encoding='utf-8') as f:
-                raw_content = f.read()
-            
-            self.anchors = self.extract_anchors(raw_content)
-            config = yaml.safe_load(raw_content)
-            
-            if not config:
-                return None
-
-            # 只保留必要的键
-            stripped = {k: config[k] for k in self.KEEP_KEYS if k in config}
-            
-            if not stripped:
-                self.logger.warning(f"No valid keys in {yaml_path}")
-                return None
-
-            # 处理锚点
-            referenced = self.find_referenced_anchors(stripped)
-            if referenced and self.anchors:
-                stripped['_anchors'] = {
-                    name: self.anchors[name]
-                    for name in referenced if name in self.anchors
-                }
-
-            # 添加元数据
-            stripped['_meta'] = {
-                'source': str(yaml_path),
-                'proxy_providers': len(stripped.get('proxy-providers', {})),
-                'rule_providers': len(stripped.get('rule-providers', {})),
-                'proxy_groups': len(stripped.get('proxy-groups', [])),
-                'rules': len(stripped.get('rules', []))
-            }
-            
-            return stripped
-            
+            return self._process_file(yaml_path)
         except Exception as e:
-            self.logger.error(f"Error processing {yaml_path}: {e}")
+            self.logger.error("Error processing %s: %s", yaml_path, e)
+            return None
+
+    def _process_file(self, yaml_path: Path) -> Optional[Dict]:
+        """处理单个 YAML 文件，出错时直接抛出异常"""
+        self.logger.debug("Processing: %s", yaml_path)
+        
+        # 原始字节直接交给 libyaml 解码；锚点正则仍在 str 上执行以支持 Unicode 名称
+        raw = yaml_path.read_bytes()
+
+        # 不含 & 的文件不可能定义锚点，跳过解码和正则扫描
+        self.anchors = self.extract_anchors(raw.decode('utf-8')) if b'&' in raw else {}
+        config = yaml.load(raw, Loader=_YamlLoader)
+
+        if not config:
             return None
 
+        if not isinstance(config, dict):
+            self.logger.warning("No valid keys in %s", yaml_path)
+            return None
+
+        # 只保留必要的键（按源文件中的顺序，输出不受集合哈希顺序影响）
+        stripped = {k: v for k, v in config.items() if k in self.KEEP_KEYS}
+
+        if not stripped:
+            self.logger.warning("No valid keys in %s", yaml_path)
+            return None
+
+        # 处理锚点（没有锚点时无需查找引用）
+        referenced = self.find_referenced_anchors(stripped) if self.anchors else set()
+        if referenced:
+            stripped['_anchors'] = {
+                name: self.anchors[name]
+                for name in referenced if name in self.anchors
+            }
+
+        # 添加元数据
+        stripped['_meta'] = {
+            'source': str(yaml_path),
+            'proxy_providers': len(stripped.get('proxy-providers', {})),
+            'rule_providers': len(stripped.get('rule-providers', {})),
+            'proxy_groups': len(stripped.get('proxy-groups', [])),
+            'rules': len(stripped.get('rules', []))
+        }
+
+        return stripped
+
     def save_file(self, config: Dict, output_path: Path):
         """保存处理后的文件"""
         output_path.parent.mkdir(parents=True, exist_ok=True)
@@ -108,55 +163,147 @@ class YAMLProcessor:
                 lines.append(anchors[name])
             lines.append("")
         
-        # 写入配置
-        yaml_content = yaml.dump(
-            config, 
-            default_flow_style=False, 
-            allow_unicode=True,
-            sort_keys=False
-        )
-        
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(lines) + '\n' + yaml_content)
+        # 写入配置（直接输出到带 1MB 缓冲的文件，不在内存中拼接完整文本）
+        with open(output_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+            f.write('\n'.join(lines) + '\n')
+            yaml.dump(
+                config, 
+                f,
+                Dumper=_YamlDumper,
+                default_flow_style=False, 
+                allow_unicode=True,
+                sort_keys=False
+            )
         
-        self.logger.info(f"Saved: {output_path}")
+        self.logger.debug("Saved: %s", output_path)
+
+    def process_one(self, yaml_file: Path, output_file: Path) -> Tuple[bool, Optional[Dict]]:
+        """处理并保存单个文件，返回 (是否成功, 结果摘要)
+
+        没有可保留内容时视为成功并返回 None；出错时返回 (False, None)，调用方不应缓存。
+        """
+        try:
+            config = self._process_file(yaml_file)
+            if config:
+                self.save_file(config, output_file)
+                return True, {
+                    'input': str(yaml_file),
+                    'output': str(output_file),
+                    'meta': config.get('_meta', {})
+                }
+            return True, None
+        except Exception as e:
+            self.logger.error("Failed to process %s: %s", yaml_file, e)
+            return False, None
+
+    def _cache_tag(self) -> list:
+        return [self.CACHE_VERSION, sorted(self.KEEP_KEYS)]
+
+    def load_cache(self, cache_path: Path) -> Dict[str, list]:
+        """读取解析缓存（JSON），不存在、损坏或版本不符时返回空缓存
+
+        条目格式为 {源文件路径: [[mtime_ns, size], 结果摘要或 null]}。
+        """
+        try:
+            with open(cache_path, 'rb') as f:
+                data = json.load(f)
+            tag, entries = data['tag'], data['entries']
+        except FileNotFoundError:
+            return {}
+        except (ValueError, TypeError, KeyError, OSError) as e:
+            self.logger.warning("Ignoring unreadable cache %s: %s", cache_path, e)
+            return {}
+        return entries if tag == self._cache_tag() and isinstance(entries, dict) else {}
+
+    def save_cache(self, cache_path: Path, entries: Dict[str, list]):
+        """写入解析缓存"""
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump({'tag': self._cache_tag(), 'entries': entries}, f, ensure_ascii=False)
 
     def process_directory(self, input_dir: Path, output_dir: Path, 
-                         recursive: bool = False) -> List[Dict]:
-        """处理目录"""
-        results = []
-        pattern = '**/*.yaml' if recursive else '*.yaml'
+                         recursive: bool = False,
+                         jobs: Optional[int] = None,
+                         use_cache: bool = True) -> List[Dict]:
+        """处理目录（各文件相互独立，分发到进程池并行处理）
+
+        源文件的 (mtime_ns, size) 与缓存记录一致且输出仍存在时直接复用上次结果。
+        """
+        yaml_files = [Path(path) for path in iter_yaml(input_dir, recursive)]
+        self.logger.info("Found %d YAML files", len(yaml_files))
+        
+        output_files = [output_dir / f.relative_to(input_dir) for f in yaml_files]
+        cache_path = output_dir / self.CACHE_FILE
+        cache = self.load_cache(cache_path) if use_cache else {}
         
-        yaml_files = list(input_dir.glob(pattern))
-        self.logger.info(f"Found {len(yaml_files)} YAML files")
+        entries = {}
+        stamps = []
+        outcomes = [None] * len(yaml_files)
+        pending = []
+        for i, (yaml_file, output_file) in enumerate(zip(yaml_files, output_files)):
+            st = yaml_file.stat()
+            stamps.append([st.st_mtime_ns, st.st_size])
+            key = str(yaml_file)
+            cached = cache.get(key)
+            if (isinstance(cached, list) and len(cached) == 2 and cached[0] == stamps[i]
+                    and (cached[1] is None or output_file.exists())):
+                entries[key] = cached
+                outcomes[i] = cached[1]
+            else:
+                pending.append(i)
         
-        for yaml_file in yaml_files:
-            if not yaml_file.is_file():
-                continue
-                
-            try:
-                rel_path = yaml_file.relative_to(input_dir)
-                output_file = output_dir / rel_path
-                
-                config = self.process_file(yaml_file)
-                if config:
-                    self.save_file(config, output_file)
-                    results.append({
-                        'input': str(yaml_file),
-                        'output': str(output_file),
-                        'meta': config.get('_meta', {})
-                    })
-            except Exception as e:
-                self.logger.error(f"Failed to process {yaml_file}: {e}")
+        if pending:
+            with ProcessPoolExecutor(
+                max_workers=jobs,
+                initializer=_init_worker,
+                initargs=(logging.getLogger().getEffectiveLevel(),)
+            ) as executor:
+                processed = executor.map(
+                    _process_one,
+                    [yaml_files[i] for i in pending],
+                    [output_files[i] for i in pending],
+                    chunksize=4
+                )
+                for i, (ok, result) in zip(pending, processed):
+                    # 出错的文件不写入缓存，下次运行重新处理
+                    if ok:
+                        entries[str(yaml_files[i])] = [stamps[i], result]
+                    outcomes[i] = result
+        self.logger.debug("Reused %d cached results", len(yaml_files) - len(pending))
         
+        if use_cache and entries != cache:
+            self.save_cache(cache_path, entries)
+        
+        results = [result for result in outcomes if result]
+        self.logger.info("Processed %d/%d YAML files", len(results), len(yaml_files))
         return results
 
 
+# 工作进程内的处理器实例，由 _init_worker 创建
+_worker_processor: Optional[YAMLProcessor] = None
+
+
+def _init_worker(log_level: int):
+    """进程池初始化：按主进程日志级别配置日志并创建处理器"""
+    global _worker_processor
+    logging.basicConfig(level=log_level, format='%(levelname)s: %(message)s')
+    _worker_processor = YAMLProcessor()
+
+
+def _process_one(yaml_file: Path, output_file: Path) -> Tuple[bool, Optional[Dict]]:
+    """在工作进程中处理单个 YAML 文件"""
+    return _worker_processor.process_one(yaml_file, output_file)
+
+
 def main():
     parser = argparse.ArgumentParser(description='Process YAML configs')
     parser.add_argument('--input', '-i', type=Path, required=True)
     parser.add_argument('--output', '-o', type=Path, required=True)
     parser.add_argument('--recursive', '-r', action='store_true')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                       help='并行进程数（默认 CPU 核数）')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='忽略并且不更新解析缓存')
     parser.add_argument('--verbose', '-v', action='store_true')
     
     args = parser.parse_args()
@@ -172,7 +319,9 @@ def main():
         return 1
     
     processor = YAMLProcessor()
-    results = processor.process_directory(args.input, args.output, args.recursive)
+    results = processor.process_directory(args.input, args.output, args.recursive,
+                                         jobs=args.jobs,
+                                         use_cache=not args.no_cache)
     
     print(f"\n✅ Successfully processed: {len(results)} files")
     return 0